@@ -1,16 +1,12 @@
 #!/usr/bin/env python3
 
-from distutils.core import setup
-try:
-    # Setuptools only needed for building the package
-    import setuptools  # noqa
-except ImportError:
-    pass
+import io
+from setuptools import setup
 
 setup(name="tabview",
       version="1.4.4",
       description="A curses command-line CSV and list (tabular data) viewer",
-      long_description=open('README.rst', 'rb').read().decode('utf-8'),
+      long_description=io.open('README.rst', encoding='utf-8').read(),
       author="Scott Hansen",
       author_email="tech@firecat53.net",
       url="https://github.com/Tabviewer/tabview",
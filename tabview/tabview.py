@@ -5,7 +5,6 @@
   Based on code contributed by A.M. Kuchling <amk at amk dot ca>
 
 """
-import csv
 import _curses
 import curses
 import curses.ascii
@@ -16,9 +15,11 @@ import re
 import string
 import sys
 from collections import Counter
+from functools import lru_cache
+from bisect import bisect_right
+from itertools import accumulate, chain
 from curses.textpad import Textbox
 from operator import itemgetter
-from subprocess import Popen, PIPE
 from textwrap import wrap
 import unicodedata
 from urllib.parse import urlparse
@@ -28,6 +29,13 @@ import shlex
 basestring = str
 file = io.FileIO
 
+# Splits a string into its digit and non-digit runs for natural sorting
+_NUM_PAT = re.compile('([0-9]+)')
+# Printable ASCII only, i.e. every character takes exactly one screen cell
+_PLAIN_PAT = re.compile('[ -~]*')
+# Whitespace that textwrap.wrap() replaces with spaces
+_WRAP_WS_PAT = re.compile('[\t\n\x0b\x0c\r]')
+
 
 # Python 3 wrappers
 def KEY_CTRL(key):
@@ -39,11 +47,6 @@ def addstr(*args):
     return scr.addstr(*args)
 
 
-def insstr(*args):
-    scr, args = args[0], args[1:]
-    return scr.insstr(*args)
-
-
 class ReloadException(Exception):
     def __init__(self, start_pos, column_width, column_gap, column_widths,
                  search_str):
@@ -75,10 +78,17 @@ class Viewer:
         os.unsetenv('LINES')
         os.unsetenv('COLUMNS')
         self.scr = args[0]
-        self.data = [[str(j) for j in i] for i in args[1]]
+        rows = args[1]
+        # Rows from process_data are already lists of strings and are kept
+        # as they are. Only rows holding anything else are copied. The outer
+        # list is always new, since rows get added, removed and sorted.
+        self.data = [i if type(i) is list and all(type(j) is str for j in i)
+                     else [str(j) for j in i] for i in rows]
         self.info = kwargs.get('info')
         self.header_offset_orig = 3
         self.header = self.data[0]
+        # Length of the longest column label, for location_string
+        self.header_max_len = max(len(i) for i in self.header)
         if len(self.data) > 1 and \
                 not any(self._is_num(cell) for cell in self.header):
             del self.data[0]
@@ -99,14 +109,28 @@ class Viewer:
             self.trunc_char = kwargs.get('trunc_char')
         except (UnicodeDecodeError, UnicodeError):
             self.trunc_char = '>'
+        # Cells are padded again on every redraw, mostly with the same
+        # contents and widths as last time
+        self.strpad = lru_cache(maxsize=4096)(self.strpad)
 
         self.x, self.y = 0, 0
         self.win_x, self.win_y = 0, 0
         self.max_y, self.max_x = 0, 0
         self.num_columns = 0
         self.vis_columns = 0
+        self.columns = ()
         self.init_search = self.search_str = kwargs.get('search_str')
         self._search_win_open = 0
+        self._search_idx = None
+        # Bumped whenever rows are added to or removed from self.data in
+        # place, which its identity doesn't show
+        self._data_gen = 0
+        self._drawn_layout = None
+        self._drawn_data = None
+        self._drawn_yx = (0, 0)
+        self._drawn_lines = {}
+        self._drawn_screen = None
+        self._divider_screen = None
         self.modifier = str()
         self.define_keys()
         self.resize()
@@ -161,6 +185,18 @@ class Viewer:
         w = max(0, min(self.max_x - xp, self.column_width[self.win_x + x]))
         return xp, w
 
+    def _column_positions(self):
+        """Return the (position, width) of each visible column, as
+        column_xw() would, in a single pass over the column widths.
+
+        """
+        cols = []
+        xp = 0
+        for w in self.column_width[self.win_x:self.win_x + self.vis_columns]:
+            cols.append((xp, max(0, min(self.max_x - xp, w))))
+            xp += w + self.column_gap
+        return tuple(cols)
+
     def quit(self):
         raise QuitException
 
@@ -246,6 +282,8 @@ class Viewer:
 
     def mark(self):
         self.save_y, self.save_x = self.y + self.win_y, self.x + self.win_x
+        # Nothing on screen changes
+        return False
 
     def goto_mark(self):
         if hasattr(self, 'save_y'):
@@ -256,8 +294,9 @@ class Viewer:
 
     def goto_y(self, y):
         y = max(min(len(self.data), y), 1)
-        if self.win_y < y <= self.win_y + \
-                (self.max_y - self.header_offset - self._search_win_open):
+        # Number of data rows on the screen
+        rows = self.max_y - self.header_offset - self._search_win_open
+        if self.win_y < y <= self.win_y + rows:
             # same screen, change y appropriately.
             self.y = y - 1 - self.win_y
         elif y <= self.win_y:
@@ -266,10 +305,8 @@ class Viewer:
             self.win_y = y - 1
         else:
             # going forward
-            self.win_y = y - (self.max_y - self.header_offset -
-                              self._search_win_open)
-            self.y = (self.max_y - self.header_offset -
-                      self._search_win_open) - 1
+            self.win_y = y - rows
+            self.y = rows - 1
 
     def goto_row(self):
         m = self.consume_modifier(len(self.data))
@@ -304,18 +341,20 @@ class Viewer:
         self.goto_x(1)
 
     def line_end(self):
-        end = len(self.data[self.y + self.win_y])
-        self.goto_x(end)
+        # Rows are padded to the same length, so there's no need to look at
+        # the current one
+        self.goto_x(self.num_data_columns)
 
     def show_cell(self):
         "Display current cell in a pop-up window"
         yp = self.y + self.win_y
         xp = self.x + self.win_x
-        s = "\n" + self.data[yp][xp]
+        s = self.data[yp][xp]
         if not s:
             # Only display pop-up if cells have contents
             return
-        TextBox(self.scr, data=s, title=self.location_string(yp, xp))()
+        TextBox(self.scr, data="\n" + s, title=self.location_string(yp, xp))()
+        self._invalidate()
         self.resize()
 
     def show_info(self):
@@ -342,6 +381,7 @@ class Viewer:
         display = "\n\n".join(["{:<20}{:<}".format(i, j)
                                for i, j in info])
         TextBox(self.scr, data=display)()
+        self._invalidate()
         self.resize()
 
     def _search_validator(self, ch):
@@ -362,7 +402,9 @@ class Viewer:
                     res = self.textpad.gather().strip().lower()
                     self.search_str = res + chr(ch)
                     self.search_results(look_in_cur=True)
-                    self.display()
+                    # The textbox refreshes its window right after this, which
+                    # sends both updates to the terminal at once
+                    self.display(flush=False)
             return ch
 
     def search(self):
@@ -372,7 +414,9 @@ class Viewer:
         scr2.box()
         scr2.move(1, 1)
         addstr(scr2, "Search: ")
-        scr2.refresh()
+        # Sent to the terminal along with the input field, which refreshes
+        # itself when it waits for the first key
+        scr2.noutrefresh()
         curses.curs_set(1)
         self._search_win_open = 3
         self.textpad = Textbox(scr3, insert_mode=True)
@@ -398,103 +442,133 @@ class Viewer:
             return
         self.search_str = self.search_str or self.init_search
         yp, xp = self.y + self.win_y, self.x + self.win_x
-        if rev is True:
-            data, yp, xp = self._reverse_data(self.data, yp, xp)
-        else:
-            data = self.data
         if look_in_cur is False:
-            # Skip ahead/back one cell
-            if xp < len(data[0]) - 1:
-                xp += 1
-            elif xp >= len(data[0]) - 1 and yp < len(data) - 1:
-                # Skip ahead a line if at the end of the current line
-                yp += 1
-                xp = 0
-            else:
-                # Skip back to the top if at the end of the data
-                yp = xp = 0
-        search_order = [self._search_cur_line_r,
-                        self._search_next_line_to_end,
-                        self._search_next_line_from_beg,
-                        self._search_cur_line_l]
-        for search in search_order:
-            y, x, res = search(data, yp, xp)
-            if res is True:
-                yp, xp = y, x
-                break
+            yp, xp = self._search_skip(yp, xp, rev)
+        index = self._search_index()
+        if index is not None and '\x1f' not in self.search_str:
+            res = self._search_index_find(index, yp, xp, rev)
+        else:
+            res = self._search_cells(yp, xp, rev)
+        if res is not None:
+            self.goto_yx(res[0] + 1, res[1] + 1)
+
+    def _search_skip(self, yp, xp, rev):
+        """Return the cell after (yp, xp), or before it if rev is True,
+        wrapping around the ends of the data.
+
+        """
+        last_y, last_x = len(self.data) - 1, len(self.data[0]) - 1
         if rev is True:
-            self.data, yp, xp = self._reverse_data(data, yp, xp)
-        if res is True:
-            self.goto_yx(yp + 1, xp + 1)
+            if xp > 0:
+                return yp, xp - 1
+            if yp > 0:
+                return yp - 1, last_x
+            return last_y, last_x
+        if xp < last_x:
+            return yp, xp + 1
+        if yp < last_y:
+            return yp + 1, 0
+        return 0, 0
+
+    def _search_index(self):
+        """Return the lowercased text of all cells, separated by '\x1f', and
+        the offset of each row in it, so a search is a single str.find().
+        Built on first use and again once the rows were sorted or the header
+        row added or removed. Returns None if a cell contains the separator,
+        since offsets can't be mapped back to cells then.
+
+        """
+        idx = self._search_idx
+        if idx is None or idx[0] is not self.data or \
+                idx[1] != self._data_gen:
+            lines = ['\x1f'.join(row).lower() for row in self.data]
+            text = '\x1f'.join(lines)
+            if text.count('\x1f') != sum(map(len, self.data)) - 1:
+                text = None
+            starts = [0]
+            starts.extend(accumulate(len(i) + 1 for i in lines[:-1]))
+            del lines
+            # self.data is kept so a new (sorted) row list is noticed, and
+            # _data_gen so a header row added or removed in place is
+            idx = self._search_idx = (self.data, self._data_gen,
+                                      None if text is None else
+                                      (text, starts))
+        return idx[2]
+
+    def _search_index_find(self, index, yp, xp, rev):
+        """Find the search string in the search index, starting at cell
+        (yp, xp) and wrapping around. Returns the (y, x) of the cell or None.
+
+        """
+        text, starts = index
+        # Offset of cell (yp, xp)
+        pos = starts[yp]
+        for _ in range(xp):
+            pos = text.index('\x1f', pos) + 1
+        needle = self.search_str
+        if rev is True:
+            # Backward from the end of this cell, then from the end of the
+            # data back to it
+            end = text.find('\x1f', pos)
+            if end == -1:
+                end = len(text)
+            hit = text.rfind(needle, 0, end)
+            if hit == -1:
+                hit = text.rfind(needle, end)
+        else:
+            hit = text.find(needle, pos)
+            if hit == -1:
+                hit = text.find(needle, 0, pos)
+        if hit == -1:
+            return None
+        y = bisect_right(starts, hit) - 1
+        return y, text.count('\x1f', starts[y], hit)
 
     def search_results_prev(self, rev=False, look_in_cur=False):
         """Search backwards"""
         self.search_results(rev=True, look_in_cur=look_in_cur)
 
-    def _reverse_yp_xp(self, data, yp, xp):
-        return len(data) - 1 - yp, len(data[0]) - 1 - xp
-
-    def _reverse_data(self, data, yp, xp):
-        yp, xp = self._reverse_yp_xp(data, yp, xp)
-        data.reverse()
-        for idx, i in enumerate(data):
-            i.reverse()
-            data[idx] = i
-        return data, yp, xp
-
-    def _search_cur_line_r(self, data, yp, xp):
-        """ Current line first, from yp,xp to the right """
-        res = False
-        for x, item in enumerate(data[yp][xp:]):
-            if self.search_str in item.lower():
-                xp += x
-                res = True
-                break
-        return yp, xp, res
-
-    def _search_cur_line_l(self, data, yp, xp):
-        """Last, search from beginning of current line to current position """
-        res = x = False
-        for x, item in enumerate(data[yp][:xp]):
-            if self.search_str in item.lower():
-                res = True
-                break
-        return yp, x, res
-
-    def _search_next_line_to_end(self, data, yp, xp):
-        """ Search from next line to the end """
-        res = done = False
-        for y, line in enumerate(data[yp + 1:]):
-            for x, item in enumerate(line):
-                if self.search_str in item.lower():
-                    done = True
-                    break
-            if done is True:
-                res = True
-                yp, xp = yp + 1 + y, x
-                break
-        return yp, xp, res
-
-    def _search_next_line_from_beg(self, data, yp, xp):
-        """Search from beginning to line before current."""
-        res = done = y = x = False
-        for y, line in enumerate(data[:yp]):
-            for x, item in enumerate(line):
-                if self.search_str in item.lower():
-                    done = True
-                    break
-            if done is True:
-                res = True
-                yp, xp = y, x
-                break
-        return yp, xp, res
+    def _search_cells(self, yp, xp, rev):
+        """Find the search string cell by cell, in the same order as
+        _search_index_find. Used when the search index can't be. Returns the
+        (y, x) of the cell or None.
+
+        """
+        data = self.data
+        ncols = len(data[0])
+        if rev is True:
+            cols = range(ncols - 1, -1, -1)
+            order = chain([(yp, range(xp, -1, -1))],
+                          ((y, cols) for y in range(yp - 1, -1, -1)),
+                          ((y, cols) for y in range(len(data) - 1, yp, -1)),
+                          [(yp, range(ncols - 1, xp, -1))])
+        else:
+            cols = range(ncols)
+            order = chain([(yp, range(xp, ncols))],
+                          ((y, cols) for y in range(yp + 1, len(data))),
+                          ((y, cols) for y in range(yp)),
+                          [(yp, range(xp))])
+        needle = self.search_str
+        for y, xs in order:
+            line = data[y]
+            if xs is cols and not self._line_has_match(line):
+                continue
+            for x in xs:
+                if needle in line[x].lower():
+                    return y, x
+        return None
+
+    def _line_has_match(self, line):
+        """Return True if any cell in line contains the search string. One
+        lower() over the joined cells is much cheaper than one per cell, so
+        lines are checked this way before looking for the matching cell.
+
+        """
+        return self.search_str in '\x1f'.join(line).lower()
 
     def help(self):
-        help_txt = readme()
-        idx = help_txt.index('Keybindings:\n')
-        help_txt = [i.replace('**', '') for i in help_txt[idx:]
-                    if '===' not in i]
-        TextBox(self.scr, data="".join(help_txt), title="Help")()
+        TextBox(self.scr, data=help_text(), title="Help")()
+        self._invalidate()
         self.resize()
 
     def toggle_header(self):
@@ -502,13 +576,21 @@ class Viewer:
             # Turn off header row
             self.header_offset = self.header_offset - 1
             self.data.insert(0, self.header)
+            self._data_gen += 1
             self.y = self.y + 1
         else:
             if len(self.data) == 1:
                 return
             # Turn on header row
             self.header_offset = self.header_offset_orig
-            del self.data[self.data.index(self.header)]
+            if self.data[0] is self.header:
+                del self.data[0]
+            else:
+                # The rows were sorted since the header row was added. Look
+                # for that row itself; a data row may be equal to it.
+                del self.data[next(i for i, row in enumerate(self.data)
+                                   if row is self.header)]
+            self._data_gen += 1
             if self.y > 0:
                 self.y = self.y - 1
             elif self.win_y > 0:
@@ -539,7 +621,8 @@ class Viewer:
 
     def column_width_down(self):
         xp = self.x + self.win_x
-        self.column_width[xp] -= max(1, int(self.column_width[xp] * 0.2))
+        self.column_width[xp] = max(1, self.column_width[xp] -
+                                    max(1, int(self.column_width[xp] * 0.2)))
         self.recalculate_layout()
 
     def column_width_up(self):
@@ -549,14 +632,28 @@ class Viewer:
 
     def sort_by_column_numeric(self):
         xp = self.x + self.win_x
-        self.data = sorted(self.data, key=lambda x:
-                           self.float_string_key(itemgetter(xp)(x)))
+        self.data = sorted(self.data, key=self.numeric_key(xp))
 
     def sort_by_column_numeric_reverse(self):
         xp = self.x + self.win_x
-        self.data = sorted(self.data, key=lambda x:
-                           self.float_string_key(itemgetter(xp)(x)),
-                           reverse=True)
+        self.data = sorted(self.data, key=self.numeric_key(xp), reverse=True)
+
+    def numeric_key(self, xp):
+        """Return a sort key for column xp that calls float_string_key only
+        once for each distinct value in the column.
+
+        """
+        keys = {}
+        float_string_key = self.float_string_key
+
+        def key(row):
+            text = row[xp]
+            k = keys.get(text)
+            if k is None:
+                k = keys[text] = float_string_key(text)
+            return k
+
+        return key
 
     def sort_by_column(self):
         xp = self.x + self.win_x
@@ -580,11 +677,18 @@ class Viewer:
         From StackOverflow: http://goo.gl/nGBUrQ
 
         """
-        def convert(text):
-            return int(text) if text.isdigit() else text
+        # Columns often repeat values, so each distinct one is only split once
+        keys = {}
 
         def alphanum_key(item):
-            return [convert(c) for c in re.split('([0-9]+)', key(item))]
+            text = key(item)
+            k = keys.get(text)
+            if k is None:
+                # Every other part is a run of digits
+                parts = _NUM_PAT.split(text)
+                parts[1::2] = map(int, parts[1::2])
+                k = keys[text] = tuple(parts)
+            return k
 
         return sorted(ls, key=alphanum_key, reverse=rev)
 
@@ -621,10 +725,9 @@ class Viewer:
             width = int(self.modifier)
             self.modifier = str()
         else:
-            width = 0
-            for y in range(0, len(self.data)):
-                width = max(width, self._cell_len(self.data[y][xs]))
-            width = min(250, width)
+            # Each distinct value only needs measuring once
+            values = set(row[xs] for row in self.data)
+            width = min(250, max(map(self._cell_len, values), default=0))
         self.column_width[xs] = width
         self.recalculate_layout()
 
@@ -637,6 +740,7 @@ class Viewer:
             os.environ['DISPLAY']
         except KeyError:
             return
+        from subprocess import Popen, PIPE
         for cmd in (['xclip', '-selection', 'clipboard'],
                     ['xsel', '-i'], ['pbcopy']):
             try:
@@ -701,6 +805,7 @@ class Viewer:
                      curses.KEY_IC: self.mark,
                      curses.KEY_DC: self.goto_mark,
                      curses.KEY_ENTER: self.show_cell,
+                     curses.KEY_RESIZE: self.resize,
                      KEY_CTRL('a'): self.line_home,
                      KEY_CTRL('e'): self.line_end,
                      KEY_CTRL('l'): self.scr.redrawwin,
@@ -710,33 +815,48 @@ class Viewer:
     def run(self):
         # Clear the screen and display the menu of keys
         # Main loop:
+        redraw = True
         while True:
-            self.display()
-            self.handle_keys()
+            if redraw:
+                self.display()
+            redraw = self.handle_keys()
+            # Keys that arrived while the last one was handled (a held down
+            # key, pasted input) are handled before drawing again, so only
+            # the end result is drawn
+            while True:
+                self.scr.nodelay(True)
+                c = self.scr.getch()
+                self.scr.nodelay(False)
+                if c == -1:
+                    break
+                redraw = self.handle_keys(c) or redraw
 
-    def handle_keys(self):
+    def handle_keys(self, c=None):
         """Determine what method to call for each keypress.
 
+        Args: c - key code as returned by getch(). Read from the screen if
+                  None.
+        Returns: True if a command ran and the screen may need redrawing,
+                 False for modifier digits, unbound keys and commands that
+                 return False to say they left the screen as it was.
+
         """
-        c = self.scr.getch()  # Get a keystroke
-        if c == curses.KEY_RESIZE:
-            self.resize()
-            return
+        if c is None:
+            c = self.scr.getch()  # Get a keystroke
         if 0 < c < 256:
             c = chr(c)
-        # Digits are commands without a modifier
-        try:
-            found_digit = c.isdigit()
-        except AttributeError:
-            # Since .isdigit() doesn't exist if c > 256, we need to catch the
-            # error for those keys.
-            found_digit = False
-        if found_digit and (len(self.modifier) > 0 or c not in self.keys):
+        handler = self.keys.get(c)
+        # Digits are commands without a modifier. Keys outside 1-255 (arrows,
+        # function keys, ...) stay ints and are never digits. Only ASCII
+        # digits count: '²' is isdigit() but int() can't parse it.
+        found_digit = isinstance(c, str) and '0' <= c <= '9'
+        if found_digit and (len(self.modifier) > 0 or handler is None):
             self.handle_modifier(c)
-        elif c in self.keys:
-            self.keys[c]()
+        elif handler is not None:
+            return handler() is not False
         else:
             self.modifier = str()
+        return False
 
     def handle_modifier(self, mod):
         """Append digits as a key modifier, clear the modifier if not
@@ -746,7 +866,7 @@ class Viewer:
             mod: potential modifier string
         """
         self.modifier += mod
-        if not self.modifier.isdigit():
+        if not self.modifier.isdecimal():
             self.modifier = str()
 
     def resize(self):
@@ -794,6 +914,10 @@ class Viewer:
             self.goto_x(self.win_x + self.x + 1)
         if self.y >= self.max_y - self.header_offset:
             self.goto_y(self.win_y + self.y + 1)
+        # Every change to the window position, column widths, gap or screen
+        # size comes through here, so the column positions are only
+        # recalculated now rather than on every redraw
+        self.columns = self._column_positions()
 
     def location_string(self, yp, xp):
         """Create (y,x) col_label string. Max 30% of screen width. (y,x) is
@@ -806,14 +930,15 @@ class Viewer:
         max_y = str(len(self.data))
         max_x = str(len(self.data[0]))
         max_yx = yx_str.format(max_y, max_x)
-        max_label = label_str.format('-', max(self.header, key=len))
+        max_width = self.max_x * 3 // 10
         if self.header_offset != self.header_offset_orig:
             # Hide column labels if header row disabled
             label = ""
-            max_width = min(int(self.max_x * .3), len(max_yx))
+            max_width = min(max_width, len(max_yx))
         else:
             label = label_str.format('-', self.header[xp])
-            max_width = min(int(self.max_x * .3), len(max_yx + max_label))
+            # "-," plus the longest column label
+            max_width = min(max_width, len(max_yx) + 2 + self.header_max_len)
         yx = yx_str.format(yp + 1, xp + 1)
         pad = " " * (max_width - len(yx) - len(label))
         all = "{}{}{}".format(yx, label, pad)
@@ -821,8 +946,66 @@ class Viewer:
             all = all[:max_width - 1] + self.trunc_char
         return all
 
-    def display(self):
-        """Refresh the current display"""
+    def _invalidate(self):
+        """Forget what was drawn, e.g. after a pop-up window covered the
+        screen, so the next display() repaints everything.
+
+        """
+        self._drawn_layout = None
+        self._drawn_data = None
+        self._drawn_lines = {}
+        self._divider_screen = None
+
+    def _layout_key(self):
+        """Return everything besides the cursor position that determines what
+        the table area looks like. If it hasn't changed since the last full
+        redraw, only the cursor cells need repainting.
+
+        """
+        return (self.win_y, self.win_x, self.max_y, self.max_x,
+                self.header_offset, self.columns, self._search_win_open,
+                self._data_gen)
+
+    def _is_plain_cell(self, y, x):
+        """Return True if the cell at screen position (y, x) holds only
+        printable ASCII. Other text may be drawn wider than its column and
+        spill into its neighbours, so it can't be repainted on its own.
+
+        """
+        return _PLAIN_PAT.fullmatch(
+            self.data[y + self.win_y][x + self.win_x]) is not None
+
+    def _set_cell_attr(self, y, x, attr):
+        """Change the attribute of the cell at screen position (y, x) of the
+        table area. Its text is already on screen, so it isn't written again.
+        Does nothing for rows outside the window, where the cursor can be
+        left by a page down past the end of the data.
+
+        """
+        if not 0 <= y < self.max_y - self.header_offset - \
+                self._search_win_open:
+            return
+        xc, wc = self.columns[x]
+        if wc > 0:
+            self.scr.chgat(y + self.header_offset, xc, wc, attr)
+
+    def display(self, flush=True):
+        """Refresh the current display.
+
+        Args: flush - False to only stage the changes, leaving the terminal
+                      update to the next doupdate() or window refresh
+
+        """
+        self._draw()
+        self.scr.noutrefresh()
+        if flush:
+            curses.doupdate()
+
+    def _draw_status(self):
+        """Draw the status line (cursor location and cell contents) and the
+        divider below it.
+
+        """
         yp = self.y + self.win_y
         xp = self.x + self.win_x
 
@@ -837,39 +1020,136 @@ class Viewer:
         s = self.cellstr(yp, xp, wc)
         addstr(self.scr, "  " + s, curses.A_NORMAL)
 
-        # Print a divider line
-        self.scr.hline(1, 0, curses.ACS_HLINE, self.max_x)
+        # Print a divider line. It only changes with the screen size, but
+        # wide characters in the line above can spill onto it, so it is
+        # redrawn after those too.
+        screen = (self.max_y, self.max_x, self._search_win_open)
+        if screen != self._divider_screen or \
+                not _PLAIN_PAT.fullmatch(info + s):
+            self.scr.hline(1, 0, curses.ACS_HLINE, self.max_x)
+            self._divider_screen = screen
+
+    def _draw(self):
+        """Draw the current view into the screen buffer. If only the cursor
+        moved within the current window, just the status line and the old and
+        new cursor cells are redrawn.
+
+        """
+        self._draw_status()
+
+        layout = self._layout_key()
+        # The row list itself is compared, not its id(): two sorts between
+        # redraws can free the drawn list and reuse its id for a new one.
+        # Changes made to it in place are caught by _data_gen in the layout.
+        if layout == self._drawn_layout and self.data is self._drawn_data and \
+                self._is_plain_cell(*self._drawn_yx) and \
+                self._is_plain_cell(self.y, self.x):
+            if self._drawn_yx != (self.y, self.x):
+                self._set_cell_attr(*self._drawn_yx, curses.A_NORMAL)
+                self._set_cell_attr(self.y, self.x, curses.A_REVERSE)
+                # Those two lines no longer match what was recorded for them
+                self._drawn_lines.pop(self._drawn_yx[0] + self.header_offset,
+                                      None)
+                self._drawn_lines.pop(self.y + self.header_offset, None)
+                self._drawn_yx = (self.y, self.x)
+            return
+
+        # Lines are only redrawn if their contents changed since the last
+        # frame. That record is only good while nothing else has drawn over
+        # the screen (see _invalidate) and its size is unchanged.
+        screen = (self.max_y, self.max_x, self._search_win_open)
+        if screen != self._drawn_screen:
+            self._drawn_lines = {}
+            self._drawn_screen = screen
+        drawn_lines = self._drawn_lines
+
+        cols = self.columns
+        gap = " " * self.column_gap
 
         # Print the header if the correct offset is set
         if self.header_offset == self.header_offset_orig:
-            self.scr.move(self.header_offset - 1, 0)
-            self.scr.clrtoeol()
-            for x in range(0, self.vis_columns):
-                xc, wc = self.column_xw(x)
-                s = self.hdrstr(x + self.win_x, wc)
-                addstr(self.scr, self.header_offset - 1, xc, s, curses.A_BOLD)
+            yc = self.header_offset - 1
+            key = ('header', cols, self.win_x)
+            if drawn_lines.get(yc) != key:
+                drawn_lines[yc] = key
+                self.scr.move(yc, 0)
+                self.scr.clrtoeol()
+                labels = self.header[self.win_x:self.win_x + len(cols)]
+                hdr = [self.hdrstr(x + self.win_x, wc)
+                       for x, (xc, wc) in enumerate(cols)]
+                if _PLAIN_PAT.fullmatch("".join(labels)):
+                    # Same as the plain table rows below: one write
+                    addstr(self.scr, yc, 0, gap.join(hdr), curses.A_BOLD)
+                else:
+                    for (xc, wc), s in zip(cols, hdr):
+                        addstr(self.scr, yc, xc, s, curses.A_BOLD)
 
         # Print the table data
-        for y in range(0, self.max_y - self.header_offset -
+        scr_addstr, scr_insstr = self.scr.addstr, self.scr.insstr
+        move, clrtoeol = self.scr.move, self.scr.clrtoeol
+        strpad = self.strpad
+        data = self.data
+        A_NORMAL, A_REVERSE = curses.A_NORMAL, curses.A_REVERSE
+        last_y, last_x = self.max_y - 1, self.vis_columns - 1
+        # Loop invariants, looked up once instead of once per line
+        header_offset, win_y = self.header_offset, self.win_y
+        x0, ncols = self.win_x, len(cols)
+        x1 = x0 + ncols
+        cur_y, cur_x = self.y, self.x
+        nrows = len(data)
+        spilled = False
+        for y in range(0, self.max_y - header_offset -
                        self._search_win_open):
-            yc = y + self.header_offset
-            self.scr.move(yc, 0)
-            self.scr.clrtoeol()
-            for x in range(0, self.vis_columns):
-                if x == self.x and y == self.y:
-                    attr = curses.A_REVERSE
+            yc = y + header_offset
+            yp = y + win_y
+            if yp >= nrows:
+                row = key = None
+            else:
+                # Clip the row to the visible columns once, so the cell loops
+                # below need no bounds checks
+                row = data[yp][x0:x1]
+                if len(row) < ncols:
+                    row = row + [""] * (ncols - len(row))
+                key = (cols, tuple(row), cur_x if y == cur_y else -1)
+            if not spilled and yc in drawn_lines and \
+                    drawn_lines[yc] == key:
+                continue
+            drawn_lines[yc] = key
+            spilled = False
+            move(yc, 0)
+            clrtoeol()
+            if row is None:
+                # Past the end of the data, leave the line blank
+                continue
+            if _PLAIN_PAT.fullmatch("".join(row)):
+                # Every character is one cell wide, so the padded cells line
+                # up when written as a single string. Only the cursor cell
+                # needs a separate write.
+                line = gap.join(strpad(s, wc)
+                                for s, (xc, wc) in zip(row, cols))
+                if yc == last_y:
+                    scr_insstr(yc, 0, line, A_NORMAL)
                 else:
-                    attr = curses.A_NORMAL
-                xc, wc = self.column_xw(x)
-                s = self.cellstr(y + self.win_y, x + self.win_x, wc)
-                if yc == self.max_y - 1 and x == self.vis_columns - 1:
+                    scr_addstr(yc, 0, line, A_NORMAL)
+                if y == cur_y:
+                    self._set_cell_attr(y, cur_x, A_REVERSE)
+                continue
+            # Text that is drawn wider than strpad expects can run onto the
+            # next line, so that one has to be redrawn as well
+            spilled = True
+            for x, (xc, wc) in enumerate(cols):
+                s = strpad(row[x], wc)
+                attr = A_REVERSE if x == cur_x and y == cur_y else A_NORMAL
+                if yc == last_y and x == last_x:
                     # Prevents a curses error when filling in the bottom right
                     # character
-                    insstr(self.scr, yc, xc, s, attr)
+                    scr_insstr(yc, xc, s, attr)
                 else:
-                    addstr(self.scr, yc, xc, s, attr)
+                    scr_addstr(yc, xc, s, attr)
 
-        self.scr.refresh()
+        self._drawn_layout = layout
+        self._drawn_data = self.data
+        self._drawn_yx = (self.y, self.x)
 
     def strpad(self, s, width):
         if width < 1:
@@ -877,6 +1157,12 @@ class Viewer:
         if '\n' in s:
             s = s.replace('\n', '\\n')
 
+        if _PLAIN_PAT.fullmatch(s):
+            # Every character is one cell wide, so pad or cut by length
+            if len(s) <= width:
+                return s.ljust(width)
+            return s[:max(0, width - len(self.trunc_char))] + self.trunc_char
+
         # take into account double-width characters
         buf = str()
         buf_width = 0
@@ -943,11 +1229,14 @@ class Viewer:
         (double-width aware). Defined as self._cell_len in __init__
 
         """
-        len = 0
+        if _PLAIN_PAT.fullmatch(s):
+            # No double-width characters possible
+            return len(s)
+        width = 0
         for c in s:
             w = 2 if unicodedata.east_asian_width(c) == 'W' else 1
-            len += w
-        return len
+            width += w
+        return width
 
     def _mode_len(self, x):
         """Compute arithmetic mode (most common value) of the length of each item
@@ -957,8 +1246,13 @@ class Viewer:
             Returns: mode - int.
 
         """
-        lens = [self._cell_len(i) for i in x]
-        m = Counter(lens).most_common()
+        # Measure each distinct value once and count lengths by value. The
+        # lengths are still counted in order of first appearance, so ties
+        # in most_common() come out the same.
+        lens = Counter()
+        for value, n in Counter(x).items():
+            lens[self._cell_len(value)] += n
+        m = lens.most_common()
         # If there are a lot of empty columns, use the 2nd most common length
         # besides 0
         try:
@@ -992,7 +1286,7 @@ class Viewer:
 
         """
         d = zip(*d)
-        return [max(1, min(250, max(set(self._cell_len(j) for j in i))))
+        return [max(1, min(250, max(map(self._cell_len, set(i)))))
                 for i in d]
 
     def _skip_to_value_change(self, x_inc, y_inc):
@@ -1054,36 +1348,53 @@ class TextBox:
         """Setup popup window and format data. """
         self.scr.touchwin()
         self.term_rows, self.term_cols = self.scr.getmaxyx()
-        self.box_height = self.term_rows - int(self.term_rows / 2)
-        self.win = curses.newwin(int(self.term_rows / 2),
+        self.box_height = self.term_rows - self.term_rows // 2
+        self.win = curses.newwin(self.term_rows // 2,
                                  self.term_cols, self.box_height, 0)
         try:
             curses.curs_set(False)
         except _curses.error:
             pass
         # transform raw data into list of lines ready to be printed
-        s = self.data.splitlines()
-        s = [wrap(i, self.term_cols - 3, subsequent_indent=" ") or [""] for i in s]
-        self.tdata = [i for j in s for i in j]
+        width = self.term_cols - 3
+        self.tdata = []
+        for i in self.data.splitlines():
+            if len(i) <= width and not i[-1:].isspace() and \
+                    not _WRAP_WS_PAT.search(i):
+                # Nothing for wrap() to split or clean up
+                self.tdata.append(i)
+            else:
+                self.tdata.extend(wrap(i, width, subsequent_indent=" ") or
+                                  [""])
         # -3 -- 2 for the box lines and 1 for the title row
         self.nlines = min(len(self.tdata), self.box_height - 3)
-        self.scr.refresh()
+        # Sent to the terminal with the box on the first display()
+        self.scr.noutrefresh()
 
     def run(self):
         self._running = True
         self._calculate_layout()
+        # Wait for keys, whatever input mode the screen was left in
+        self.scr.nodelay(False)
+        redraw = True
         while self._running:
-            self.display()
+            if redraw:
+                self.display()
             c = self.scr.getch()
-            self.handle_key(c)
+            redraw = self.handle_key(c)
 
     def handle_key(self, key):
+        """Run the handler for key. Returns False if there is none, so the
+        box doesn't need redrawing.
+
+        """
         if 0 < key < 256:
             key = chr(key)
-        try:
-            self.handlers[key]()
-        except KeyError:
-            pass
+        handler = self.handlers.get(key)
+        if handler is None:
+            return False
+        handler()
+        return True
 
     def close(self):
         self._running = False
@@ -1105,76 +1416,118 @@ class TextBox:
                                   self.nlines]
         addstr(self.win, 2, 1, '\n '.join(visible_rows))
         self.win.box()
-        self.win.refresh()
+        self.win.noutrefresh()
+        curses.doupdate()
 
 
-def csv_sniff(data, enc):
-    """Given a list, sniff the dialect of the data and return it.
+def csv_sniff(data):
+    """Given a decoded line, sniff the dialect of the data and return it.
+
+    Only the first 64 KiB are looked at. The first line of a file with no
+    line breaks can be the whole file, and the sniffer's regexes slow down
+    on long input.
 
     Args:
-        data - list like ["col1,col2,col3"]
-        enc - python encoding value ('utf_8','latin-1','cp870', etc)
+        data - string like "col1,col2,col3"
     Returns:
         csv.dialect.delimiter
 
     """
-    data = data.decode(enc)
-    dialect = csv.Sniffer().sniff(data)
+    import csv
+    dialect = csv.Sniffer().sniff(data[:65536])
     return dialect.delimiter
 
 
 def fix_newlines(data):
     """If there are windows \r newlines in the input data, split the string on
     the \r characters. I can't figure another way to enable universal newlines
-    without messing up Unicode support.
+    without messing up Unicode support. The lines keep a \n ending so they can
+    be joined back together.
 
     """
     if len(data) == 1 and b'\r' in data[0]:
-        data = data[0].split(b'\r')
+        data = data[0].replace(b'\r', b'\n').splitlines(keepends=True)
     return data
 
 
-def adjust_space_delim(data, enc):
-    """Take data that is space deliminated and clean it to be a *single* space
+def adjust_space_delim(data):
+    """Take decoded data that is space deliminated and clean it to be a
+    *single* space
 
     Additionally, if (and only if) the first line begins with '#' or '%',
     strip that off. Common pattern in Matlab and Numpy
 
     """
-    if data[0].decode(enc)[0] in '%#':
+    if data[0][0] in '%#':
         data[0] = data[0][1:]
 
     # Split at the white space preserving quotes (if applicable) and
     # trailing \n
-    return [(' '.join(shlex.split(d.decode(enc))) + '\n').encode(enc)
-            for d in data]
+    return [' '.join(shlex.split(d)) + '\n' for d in data]
 
 
 def process_data(data, enc=None, delim=None, quoting=None, quote_char=str('"')):
-    """Given a list of lists, check for the encoding, quoting and delimiter and
-    return a list of CSV rows (normalized to a single length)
+    """Given a list of lists, or file contents as bytes or a list of byte
+    lines, check for the encoding, quoting and delimiter and return a list of
+    CSV rows (normalized to a single length)
 
     """
-    data = fix_newlines(data)
-    if data_list_or_file(data) == 'list':
-        # If data is from an object (list of lists) instead of a file
-        return pad_data(data)
+    if isinstance(data, bytes):
+        buf = data
+        if b'\r' in buf and buf.find(b'\n') in (-1, len(buf) - 1):
+            # Only \r line endings, see fix_newlines
+            buf = buf.replace(b'\r', b'\n')
+    else:
+        data = fix_newlines(data)
+        if data_list_or_file(data) == 'list':
+            # If data is from an object (list of lists) instead of a file
+            return pad_data(data)
+        buf = b''.join(data)
+    # Only needed for file data, so viewing a list of lists doesn't load it
+    import csv
+    # Decode the whole buffer in one call instead of line by line, then split
+    # it back into lines (on '\n' only, keeping the line endings) for the
+    # parser. Sniffing and space cleanup reuse the decoded lines.
     if enc is None:
-        enc = detect_encoding(data)
+        # Keep the text from the first encoding that works rather than
+        # decoding the buffer a second time once it is known
+        for enc in _encodings():
+            try:
+                text = buf.decode(enc)
+                break
+            except (UnicodeDecodeError, UnicodeError):
+                continue
+    else:
+        text = buf.decode(enc)
+    del buf
+    data = io.StringIO(text).readlines()
+    del text
     if delim is None:
-        delim = csv_sniff(data[0], enc)
+        delim = csv_sniff(data[0])
         if ' ' in delim:
-            data = adjust_space_delim(data, enc)
+            data = adjust_space_delim(data)
     if quoting is not None:
         quoting = getattr(csv, quoting)
     else:
         quoting = csv.QUOTE_MINIMAL
-    csv_data = []
-    data = [i.decode(enc) for i in data]
-    csv_obj = csv.reader(data, delimiter=delim, quoting=quoting,
-                         quotechar=quote_char)
-    for row in csv_obj:
-        csv_data.append(row)
+    if quoting == csv.QUOTE_NONE or (quoting != csv.QUOTE_NONNUMERIC and
+                                     not any(quote_char in i for i in data)):
+        # Nothing is quoted, so a plain split gives the same rows as the csv
+        # module without running every line through its state machine.
+        rows = (i.rstrip('\r\n').split(delim) for i in data)
+    else:
+        rows = csv.reader(data, delimiter=delim, quoting=quoting,
+                          quotechar=quote_char)
+        if quoting == csv.QUOTE_NONNUMERIC:
+            # Unquoted fields are returned as floats
+            return pad_data(list(rows))
+    # Short values (categories, flags, small numbers) tend to repeat down a
+    # column. Sharing them keeps one copy of each instead of one per cell.
+    # The dict only lives for this parse; sys.intern() can keep every string
+    # it is given alive until the interpreter exits.
+    share = {}.setdefault
+    csv_data = [[share(c, c) if len(c) < 32 else c for c in row]
+                for row in rows]
     return pad_data(csv_data)
 
 
@@ -1205,12 +1558,39 @@ def pad_data(d):
         return [i + [""] * (max_len - len(i)) for i in d]
 
 
+@lru_cache(maxsize=1)
 def readme():
+    # Read once; the help screen asks for it every time it opens
     path = os.path.dirname(os.path.realpath(__file__))
     fn = os.path.join(path, "README.rst")
     with open(fn, 'rb') as f:
-        h = f.readlines()
-        return [i.decode('utf-8') for i in h]
+        return f.read().decode('utf-8')
+
+
+@lru_cache(maxsize=1)
+def help_text():
+    """Return the keybindings section of the README, formatted for the help
+    screen.
+
+    """
+    help_txt = readme()
+    idx = help_txt.index('Keybindings:\n')
+    help_txt = [i for i in help_txt[idx:].replace('**', '').splitlines(True)
+                if '===' not in i]
+    return "".join(help_txt)
+
+
+def _encodings():
+    """Return the encodings to try on input data, in order. The system
+    encoding goes first if it isn't one of the usual ones.
+
+    """
+    enc_list = ['utf-8', 'latin-1', 'iso8859-1', 'iso8859-2',
+                'utf-16', 'cp720']
+    code = locale.getpreferredencoding(False)
+    if code.lower() not in enc_list:
+        enc_list.insert(0, code.lower())
+    return enc_list
 
 
 def detect_encoding(data=None):
@@ -1224,14 +1604,9 @@ def detect_encoding(data=None):
         enc - system encoding
 
     """
-    enc_list = ['utf-8', 'latin-1', 'iso8859-1', 'iso8859-2',
-                'utf-16', 'cp720']
-    code = locale.getpreferredencoding(False)
     if data is None:
-        return code
-    if code.lower() not in enc_list:
-        enc_list.insert(0, code.lower())
-    for c in enc_list:
+        return locale.getpreferredencoding(False)
+    for c in _encodings():
         try:
             for line in data:
                 line.decode(c)
@@ -1242,6 +1617,11 @@ def detect_encoding(data=None):
 
 
 def main(stdscr, *args, **kwargs):
+    """Run the viewer in an initialized curses screen. If a 'reload' callable
+    is passed, a reload request calls it with the current data to get the new
+    data and restarts the viewer on the same screen.
+
+    """
     try:
         curses.use_default_colors()
     except (AttributeError, _curses.error):
@@ -1250,7 +1630,21 @@ def main(stdscr, *args, **kwargs):
         curses.curs_set(False)
     except (AttributeError, _curses.error):
         pass
-    Viewer(stdscr, *args, **kwargs).run()
+    reload = kwargs.pop('reload', None)
+    while True:
+        try:
+            Viewer(stdscr, *args, **kwargs).run()
+        except ReloadException as e:
+            if reload is None:
+                raise
+            kwargs.update(start_pos=e.start_pos,
+                          column_width=e.column_width_mode,
+                          column_gap=e.column_gap,
+                          column_widths=e.column_widths,
+                          search_str=e.search_str)
+        # Load the new data once the except block is over. Until then the
+        # exception's traceback keeps the old Viewer, and its rows, alive.
+        args = (reload(args[0]),) + args[1:]
 
 
 def view(data, enc=None, start_pos=(0, 0), column_width=20, column_gap=2,
@@ -1295,48 +1689,48 @@ def view(data, enc=None, start_pos=(0, 0), column_width=20, column_gap=2,
     lc_all = None
     if info is None:
         info = ""
-    try:
-        buf = None
-        while True:
-            try:
-                if isinstance(data, basestring):
-                    parsed_path = parse_path(data)
-                    with open(parsed_path, 'rb') as fd:
-                        new_data = fd.readlines()
-                        if info == "":
-                            info = data
-                elif isinstance(data, (io.IOBase, file)):
-                    new_data = data.readlines()
-                else:
-                    new_data = data
 
-                if new_data:
-                    buf = process_data(new_data, enc, delimiter, quoting, quote_char)
-                elif buf:
-                    # cannot reload the file
-                    pass
-                else:
-                    # cannot read the file
-                    return 1
-
-                curses.wrapper(main, buf,
-                               start_pos=start_pos,
-                               column_width=column_width,
-                               column_gap=column_gap,
-                               trunc_char=trunc_char,
-                               column_widths=column_widths,
-                               search_str=search_str,
-                               double_width=double_width,
-                               info=info)
-            except (QuitException, KeyboardInterrupt):
-                return 0
-            except ReloadException as e:
-                start_pos = e.start_pos
-                column_width = e.column_width_mode
-                column_gap = e.column_gap
-                column_widths = e.column_widths
-                search_str = e.search_str
-                continue
+    def load(buf):
+        """Read and process the data. Returns 'buf' (the previously loaded
+        data) if nothing could be read.
+
+        """
+        nonlocal info
+        if isinstance(data, basestring):
+            parsed_path = parse_path(data)
+            # Read the file as one buffer; splitting it into lines first
+            # would only be joined back together by process_data
+            with open(parsed_path, 'rb') as fd:
+                new_data = fd.read()
+                if info == "":
+                    info = data
+        elif isinstance(data, (io.IOBase, file)):
+            new_data = data.read()
+        else:
+            new_data = data
+        if new_data:
+            return process_data(new_data, enc, delimiter, quoting, quote_char)
+        # cannot (re)load the file
+        return buf
+
+    try:
+        buf = load(None)
+        if not buf:
+            # cannot read the file
+            return 1
+        # Reloads are handled inside main so curses is only set up once
+        curses.wrapper(main, buf,
+                       reload=load,
+                       start_pos=start_pos,
+                       column_width=column_width,
+                       column_gap=column_gap,
+                       trunc_char=trunc_char,
+                       column_widths=column_widths,
+                       search_str=search_str,
+                       double_width=double_width,
+                       info=info)
+    except (QuitException, KeyboardInterrupt):
+        return 0
     finally:
         if lc_all is not None:
             locale.setlocale(locale.LC_ALL, lc_all)
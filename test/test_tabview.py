@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import curses
+import curses.ascii
 import unittest
+from curses.textpad import Textbox
 import tabview.tabview as t
 
 res1 = ["Yugoslavia (Latin)", "Djordje Balasevic", "Jugoslavija",
@@ -103,6 +105,28 @@ class TestTabviewUnits(unittest.TestCase):
                 i = str(i)
             self.assertEqual(i, res[0][j])
 
+    def test_tabview_unquoted_split(self):
+        """Test that unquoted data (split directly) and quoted data (parsed by
+        the csv module) give the same rows.
+
+        """
+        unquoted = [b'a,b,c\n', b'1,2,3\n', b'4,,6\r\n']
+        quoted = [b'"a","b","c"\n', b'1,"2",3\n', b'4,,"6"\r\n']
+        res = [['a', 'b', 'c'], ['1', '2', '3'], ['4', '', '6']]
+        self.assertEqual(t.process_data(unquoted), res)
+        self.assertEqual(t.process_data(quoted), res)
+
+    def test_tabview_file_buffer(self):
+        """Test that a whole-file bytes buffer gives the same rows as the
+        file's lines.
+
+        """
+        for fn in (data_1[0], data_2[0], data_3[0], win_newlines):
+            with open(fn, 'rb') as f:
+                buf = f.read()
+            self.assertEqual(t.process_data(buf),
+                             t.process_data(self.data(fn)))
+
     def test_tabview_uri_parse(self):
         # Strip 'file://' from uri (three slashes)
         path = t.parse_path('file:///home/user/test.csv')
@@ -171,6 +195,296 @@ class TestTabviewIntegration(unittest.TestCase):
                        start_pos=(0, 1), column_width='mode', column_gap=5,
                        column_widths=None, trunc_char='…', search_str=None)
 
+    def modifier(self, stdscr):
+        curses.use_default_colors()
+        curses.curs_set(False)
+        v = t.Viewer(stdscr, t.process_data(list_1), start_pos=0,
+                     column_width=5, column_gap=2, column_widths=None,
+                     trunc_char='>', search_str=None)
+        v.display()
+        for c in (ord('2'), ord('1')):
+            v.handle_keys(c)
+        self.assertEqual(v.modifier, '21')
+        # '²' isn't a modifier digit, it clears the modifier like any other
+        # unbound key
+        v.handle_keys(0xb2)
+        self.assertEqual(v.modifier, '')
+        self.assertEqual(v.consume_modifier(), 1)
+
+    def test_tabview_modifier(self):
+        curses.wrapper(self.modifier)
+
+    def sort_redraw(self, stdscr):
+        curses.use_default_colors()
+        curses.curs_set(False)
+        v = t.Viewer(stdscr, [['h'], ['b'], ['a'], ['c']], start_pos=0,
+                     column_width=5, column_gap=2, column_widths=None,
+                     trunc_char='>', search_str=None)
+        v.display()
+        # Two sorts between redraws, as in one burst of keys. The first
+        # sorted list is freed and the second may reuse its id().
+        v.keys['S']()
+        v.keys['S']()
+        v.display()
+        rows = [stdscr.instr(y, 0, 1).decode() for y in range(3, 6)]
+        self.assertEqual(rows, ['c', 'b', 'a'])
+
+    def test_tabview_sort_redraw(self):
+        curses.wrapper(self.sort_redraw)
+
+    def toggle_redraw(self, stdscr):
+        curses.use_default_colors()
+        curses.curs_set(False)
+        v = t.Viewer(stdscr, [['h'], ['b'], ['c'], ['a']], start_pos=0,
+                     column_width=5, column_gap=2, column_widths=None,
+                     trunc_char='>', search_str=None)
+        v.keys['t']()
+        v.keys['s']()
+        v.display()
+        rows = [stdscr.instr(y, 0, 1).decode() for y in range(2, 6)]
+        self.assertEqual(rows, ['a', 'b', 'c', 'h'])
+        # Two toggles between redraws leave the layout and cursor as they
+        # were, but move the header row back to the top of the same list
+        v.keys['t']()
+        v.keys['t']()
+        v.display()
+        rows = [stdscr.instr(y, 0, 1).decode() for y in range(2, 6)]
+        self.assertEqual(rows, ['h', 'a', 'b', 'c'])
+
+    def test_tabview_toggle_redraw(self):
+        curses.wrapper(self.toggle_redraw)
+
+    def viewer(self, stdscr, data):
+        curses.use_default_colors()
+        curses.curs_set(False)
+        v = t.Viewer(stdscr, data, start_pos=0, column_width=10,
+                     column_gap=2, column_widths=None, trunc_char='>',
+                     search_str=None)
+        v.display()
+        return v
+
+    def find(self, v, s, yx, rev=False, look_in_cur=False):
+        """Search for s from cell yx (0 based) and return the cursor cell."""
+        v.goto_yx(yx[0] + 1, yx[1] + 1)
+        v.search_str = s
+        v.search_results(rev=rev, look_in_cur=look_in_cur)
+        return v.y + v.win_y, v.x + v.win_x
+
+    def page_down_end(self, stdscr):
+        v = self.viewer(stdscr, [['h']] + [[str(i)] for i in range(100)])
+        # A page count that goes past the end puts the cursor on the last
+        # row, which can be below the window. Redrawing must not fail.
+        v.modifier = '5'
+        v.keys['J']()
+        self.assertEqual(v.y + v.win_y, len(v.data) - 1)
+        v.display()
+        v.keys['k']()
+        v.display()
+
+    def test_tabview_page_down_end(self):
+        curses.wrapper(self.page_down_end)
+
+    def toggle_equal_row(self, stdscr):
+        # A data row equal to the header row, but not the same row
+        v = self.viewer(stdscr, [['h', '1'], ['a', '2'], ['h', '1']])
+        header, row = v.header, v.data[1]
+        for k in 'tStsat':
+            v.keys[k]()
+            self.assertEqual(sum(i is header for i in v.data),
+                             v.header_offset != v.header_offset_orig)
+            self.assertTrue(any(i is row for i in v.data))
+        self.assertEqual(v.header_offset, v.header_offset_orig)
+        self.assertEqual(v.data, [['a', '2'], ['h', '1']])
+
+    def test_tabview_toggle_equal_row(self):
+        curses.wrapper(self.toggle_equal_row)
+
+    def natural_sort(self, stdscr):
+        v = self.viewer(stdscr, [['h1', 'h2'], ['a10', 'x'], ['a9', 'y'],
+                                 ['a100', 'z']])
+        v.keys['a']()
+        self.assertEqual([i[0] for i in v.data], ['a9', 'a10', 'a100'])
+        # The keys from the last sort must not be reused once the values
+        # changed
+        v.data[0][0] = 'a1000'
+        v.keys['a']()
+        self.assertEqual([i[0] for i in v.data], ['a10', 'a100', 'a1000'])
+        # nor for another column
+        v.goto_yx(1, 2)
+        v.keys['A']()
+        self.assertEqual([i[1] for i in v.data], ['z', 'y', 'x'])
+        self.assertEqual(v.sorted_nicely(['b2', 'b10', 'b1'], str),
+                         ['b1', 'b2', 'b10'])
+
+    def test_tabview_natural_sort(self):
+        curses.wrapper(self.natural_sort)
+
+    def column_width_down(self, stdscr):
+        v = self.viewer(stdscr, [['h1', 'h2', 'h3'], ['abc', 'def', 'ghi']])
+        for _ in range(12):
+            v.keys[',']()
+        self.assertEqual(v.column_width, [1, 10, 10])
+        v.display()
+        # The following columns stay where their positions say they are
+        xc, wc = v.columns[1]
+        self.assertEqual(xc, 3)
+        self.assertEqual(stdscr.instr(3, xc, 3).decode(), 'def')
+
+    def test_tabview_column_width_down(self):
+        curses.wrapper(self.column_width_down)
+
+    def screen(self, stdscr):
+        rows, cols = stdscr.getmaxyx()
+        return [stdscr.instr(y, 0, cols - 1).decode() for y in range(rows)]
+
+    def burst(self, stdscr):
+        data = [['h', 'x'], ['b', '2'], ['c', '3'], ['a', '1']]
+        setup, bursts = 'ts', ['jlSsjj', 'tt', 'kht', 'tt']
+        # Drawn after every key, with the screen kept at the end of each
+        # burst
+        v = self.viewer(stdscr, [list(i) for i in data])
+        for k in setup:
+            v.handle_keys(ord(k))
+            v.display()
+        expected = []
+        for keys in bursts:
+            for k in keys:
+                v.handle_keys(ord(k))
+                v.display()
+            expected.append(self.screen(stdscr))
+
+        # The same keys handled by run(), which draws once after each burst
+        v = self.viewer(stdscr, [list(i) for i in data])
+        for k in setup:
+            v.handle_keys(ord(k))
+            v.display()
+        display = v.display
+        pending = list(bursts)
+        screens = []
+
+        class Done(Exception):
+            pass
+
+        def display_and_queue(*args, **kwargs):
+            display(*args, **kwargs)
+            if len(pending) < len(bursts):
+                screens.append(self.screen(stdscr))
+            if not pending:
+                raise Done
+            for k in reversed(pending.pop(0)):
+                curses.ungetch(ord(k))
+        v.display = display_and_queue
+        self.assertRaises(Done, v.run)
+        self.assertEqual(screens, expected)
+
+    def test_tabview_burst(self):
+        curses.wrapper(self.burst)
+
+    def search(self, stdscr):
+        v = self.viewer(stdscr, [['h1', 'h2', 'h3'],
+                                 ['apple', 'Banana', 'cherry'],
+                                 ['date', 'apple pie', 'fig'],
+                                 ['grape', 'kiwi', 'APPLE']])
+        # Forward, starting after the current cell and wrapping around
+        self.assertEqual(self.find(v, 'apple', (0, 0)), (1, 1))
+        self.assertEqual(self.find(v, 'apple', (1, 1)), (2, 2))
+        self.assertEqual(self.find(v, 'apple', (2, 2)), (0, 0))
+        self.assertEqual(self.find(v, 'banana', (0, 0)), (0, 1))
+        self.assertEqual(self.find(v, 'banana', (1, 0)), (0, 1))
+        # Starting in the current cell
+        self.assertEqual(self.find(v, 'apple', (0, 0), look_in_cur=True),
+                         (0, 0))
+        self.assertEqual(self.find(v, 'pie', (1, 1), look_in_cur=True),
+                         (1, 1))
+        # Backward, wrapping around the start
+        self.assertEqual(self.find(v, 'apple', (0, 0), rev=True), (2, 2))
+        self.assertEqual(self.find(v, 'apple', (2, 2), rev=True), (1, 1))
+        self.assertEqual(self.find(v, 'apple', (1, 1), rev=True), (0, 0))
+        self.assertEqual(self.find(v, 'kiwi', (0, 1), rev=True), (2, 1))
+        # No match leaves the cursor where it was
+        self.assertEqual(self.find(v, 'zzz', (1, 2)), (1, 2))
+        self.assertEqual(self.find(v, 'zzz', (1, 2), rev=True), (1, 2))
+        # A needle can't match across cells
+        self.assertEqual(self.find(v, 'apple\x1fbanana', (1, 0)), (1, 0))
+        self.assertEqual(self.find(v, 'eb', (1, 0)), (1, 0))
+
+        # The search sees the rows in their new order after a sort
+        v.goto_yx(1, 1)
+        v.keys['S']()
+        self.assertEqual(self.find(v, 'cherry', (0, 0), look_in_cur=True),
+                         (2, 2))
+        # and the header row once it is part of the data
+        v.keys['t']()
+        self.assertEqual(self.find(v, 'h2', (2, 1)), (0, 1))
+        v.keys['t']()
+        self.assertEqual(self.find(v, 'h2', (2, 1)), (2, 1))
+
+    def test_tabview_search(self):
+        curses.wrapper(self.search)
+
+    def search_toggle(self, stdscr):
+        v = self.viewer(stdscr, [['h'], ['b'], ['c'], ['a']])
+        v.keys['t']()
+        self.assertEqual(self.find(v, 'c', (0, 0)), (2, 0))
+        # Sort with the header row in the data, then take it out and put it
+        # back at the top. The row list and its length are as before, but
+        # the rows moved.
+        v.keys['s']()
+        self.assertEqual(self.find(v, 'c', (0, 0)), (2, 0))
+        v.keys['t']()
+        v.keys['t']()
+        self.assertEqual([i[0] for i in v.data], ['h', 'a', 'b', 'c'])
+        self.assertEqual(self.find(v, 'c', (0, 0)), (3, 0))
+        self.assertEqual(self.find(v, 'h', (3, 0)), (0, 0))
+
+    def test_tabview_search_toggle(self):
+        curses.wrapper(self.search_toggle)
+
+    def search_separator(self, stdscr):
+        # Cells containing the separator the search index uses
+        v = self.viewer(stdscr, [['h1', 'h2'], ['a\x1fb', 'x'], ['y', 'b'],
+                                 ['q', 'c'], ['c', 'q']])
+        self.assertEqual(self.find(v, 'b', (0, 0)), (1, 1))
+        self.assertEqual(self.find(v, 'b', (1, 1)), (0, 0))
+        self.assertEqual(self.find(v, 'b', (0, 0), rev=True), (1, 1))
+        self.assertEqual(self.find(v, 'b', (1, 1), rev=True), (0, 0))
+        self.assertEqual(self.find(v, 'q', (0, 1), rev=True), (3, 1))
+        self.assertEqual(self.find(v, 'a\x1fb', (1, 1)), (0, 0))
+        self.assertEqual(self.find(v, 'x\x1fy', (0, 0)), (0, 0))
+
+    def test_tabview_search_separator(self):
+        curses.wrapper(self.search_separator)
+
+    def search_incremental(self, stdscr):
+        v = self.viewer(stdscr, [['h1', 'h2'], ['gin', 'x'],
+                                 ['fig', 'grape']])
+        # Set up the search window as search() does, then feed the keys
+        # through the validator the way Textbox.edit() does
+        scr2 = curses.newwin(3, v.max_x, v.max_y - 3, 0)
+        v.textpad = Textbox(scr2.derwin(1, v.max_x - 12, 1, 9),
+                            insert_mode=True)
+        v._search_win_open = 3
+
+        def key(c):
+            c = v._search_validator(c)
+            if c:
+                v.textpad.do_command(c)
+            return v.search_str, (v.y + v.win_y, v.x + v.win_x)
+
+        self.assertEqual(key(ord('g')), ('g', (0, 0)))
+        self.assertEqual(key(ord('r')), ('gr', (1, 1)))
+        self.assertEqual(key(ord('x')), ('grx', (1, 1)))
+        # Backspace shortens the search string without moving
+        self.assertEqual(key(127), ('gr', (1, 1)))
+        self.assertEqual(key(127), ('g', (1, 1)))
+        self.assertEqual(key(ord('i')), ('gi', (0, 0)))
+        self.assertEqual(v.textpad.gather().strip(), 'gi')
+        self.assertEqual(v._search_validator(curses.ascii.NL),
+                         curses.ascii.BEL)
+
+    def test_tabview_search_incremental(self):
+        curses.wrapper(self.search_incremental)
+
     def test_tabview_annotated_comment(self):
         curses.wrapper(self.main, t.process_data(self.data(data_3[0])),
                        start_pos=(0, 1), column_width='mode', column_gap=2,